@@ -1,54 +1,259 @@
+import ast
+import asyncio
+import base64
 import configparser
+import functools
+import hashlib
 import json
+import os
 import random
 import re
+import sqlite3
+import threading
 import time
 from pathlib import Path
 from re import sub
 
 import httpx
 import requests
-from openai import OpenAI
 from urllib3 import disable_warnings, exceptions
 
+from api.logger import logger
+
+try:
+    # orjson为可选依赖, 解析大模型返回的JSON比标准库快数倍; 其JSONDecodeError继承自json.JSONDecodeError
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
 # 关闭警告
 disable_warnings(exceptions.InsecureRequestWarning)
 
 
+@functools.lru_cache(maxsize=8)
+def _parse_ini_cached(path: str, mtime: float) -> configparser.ConfigParser:
+    """
+    按(绝对路径, 修改时间)缓存配置文件的解析结果, 文件被修改后会重新解析
+    """
+    config = configparser.ConfigParser()
+    config.read(path, encoding="utf8")
+    return config
+
+
+def _import_openai():
+    """
+    延迟导入openai: SDK依赖较多(pydantic等), 导入耗时可达数百毫秒, 仅在实际调用大模型时才加载
+    """
+    import openai
+    return openai
+
+
+# 批量答题时放宽连接池上限, 让并发请求复用keep-alive连接
+_HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+
+
+@functools.lru_cache(maxsize=4)
+def _get_client(api_key: str, base_url: str, timeout: float):
+    """
+    按(api_key, base_url, timeout)复用OpenAI客户端, 多个题库实例共享同一个连接池, 避免重复TLS握手
+    重试由调用方统一处理, 关闭SDK自带的重试
+    """
+    openai = _import_openai()
+    return openai.OpenAI(api_key=api_key, base_url=base_url, max_retries=0, timeout=timeout,
+                         http_client=openai.DefaultHttpxClient(limits=_HTTP_LIMITS))
+
+
+# AsyncOpenAI的连接池绑定在事件循环上, 按(api_key, base_url, timeout, 事件循环)缓存, 事件循环结束前由_close_async_clients关闭
+_async_clients = {}
+
+
+def _get_async_client(api_key: str, base_url: str, timeout: float):
+    """
+    _get_client的异步版本, 同一事件循环内的并发请求共享一个客户端
+    """
+    key = (api_key, base_url, timeout, asyncio.get_running_loop())
+    client = _async_clients.get(key)
+    if client is None:
+        openai = _import_openai()
+        client = _async_clients[key] = openai.AsyncOpenAI(
+            api_key=api_key, base_url=base_url, max_retries=0, timeout=timeout,
+            http_client=openai.DefaultAsyncHttpxClient(limits=_HTTP_LIMITS))
+    return client
+
+
+async def _close_async_clients(keep=frozenset()) -> None:
+    """
+    关闭当前事件循环创建的异步客户端并释放其连接池, 应在事件循环结束前调用; keep中的缓存键保留不关闭
+    """
+    loop = asyncio.get_running_loop()
+    for key in [key for key in _async_clients if key[-1] is loop and key not in keep]:
+        await _async_clients.pop(key).close()
+
+
+# 题干中的图片由decode._extract_title保留为<img src="...">标签
+_IMG_PATTERN = re.compile(r'<img src="(.*?)">')
+
+
+# 内联图片的大小上限, 超过时直接发送图片地址, 避免缓存中长期驻留过大的base64字符串
+_MAX_INLINE_IMAGE_BYTES = 2 * 1024 * 1024
+
+
+@functools.lru_cache(maxsize=64)
+def _inline_image(url: str) -> str:
+    """
+    下载图片并转为base64 data URI, 同一张图片被多道题目引用时只下载一次
+    图片超过_MAX_INLINE_IMAGE_BYTES时抛出ValueError
+    """
+    with httpx.stream("GET", url, timeout=10, follow_redirects=True) as resp:
+        resp.raise_for_status()
+        if int(resp.headers.get('content-length') or 0) > _MAX_INLINE_IMAGE_BYTES:
+            raise ValueError(f"图片大小超过{_MAX_INLINE_IMAGE_BYTES}字节")
+        content = bytearray()
+        for chunk in resp.iter_bytes():
+            content += chunk
+            if len(content) > _MAX_INLINE_IMAGE_BYTES:
+                raise ValueError(f"图片大小超过{_MAX_INLINE_IMAGE_BYTES}字节")
+        mime_type = resp.headers.get('content-type', 'image/jpeg').split(';')[0]
+    return f"data:{mime_type};base64,{base64.b64encode(content).decode()}"
+
+
 class CacheDAO:
     """
     @Author: SocialSisterYi
     @Reference: https://github.com/SocialSisterYi/xuexiaoyi-to-xuexitong-tampermonkey-proxy
+    答案缓存, 以规范化题目的sha256为键存储在SQLite中, 单次读写不再需要加载整个缓存文件
     """
-    DEFAULT_CACHE_FILE = "cache.json"
+    DEFAULT_CACHE_FILE = "cache.db"
+    # 旧版JSON缓存, 仅在数据库为空时导入一次; 此后对cache.json的修改不会再被读取
+    LEGACY_CACHE_FILE = "cache.json"
 
     def __init__(self, file: str = DEFAULT_CACHE_FILE):
         self.cache_file = Path(file)
-        if not self.cache_file.is_file():
-            self._write_cache({})
-
-    def _read_cache(self) -> dict:
+        self._lock = threading.Lock()
         try:
-            with self.cache_file.open("r", encoding="utf8") as fp:
-                return json.load(fp)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {}
+            self._conn = sqlite3.connect(self.cache_file, check_same_thread=False)
+            with self._lock, self._conn:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, question TEXT, answer TEXT)")
+            self._import_legacy_cache()
+        except sqlite3.Error as e:
+            # 目录只读、数据库被锁定或损坏时不使用缓存, 不影响答题
+            logger.error(f"Failed to open cache, answers will not be cached: {e}")
+            self._conn = None
 
-    def _write_cache(self, data: dict) -> None:
+    @staticmethod
+    def _make_key(question: str) -> str:
+        # 合并多余空白, 使仅空白不同的同一道题命中同一条缓存
+        normalized = " ".join(question.split())
+        return hashlib.sha256(normalized.encode("utf8")).hexdigest()
+
+    def _import_legacy_cache(self) -> None:
+        legacy_file = self.cache_file.with_name(self.LEGACY_CACHE_FILE)
+        if not legacy_file.is_file():
+            return
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM cache LIMIT 1").fetchone():
+                return
         try:
-            with self.cache_file.open("w", encoding="utf8") as fp:
-                json.dump(data, fp, ensure_ascii=False, indent=4)
-        except IOError as e:
-            logger.error(f"Failed to write cache: {e}")
+            with legacy_file.open("r", encoding="utf8") as fp:
+                data = json.load(fp)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Failed to import legacy cache: {e}")
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO cache (key, question, answer) VALUES (?, ?, ?)",
+                [(self._make_key(q), q, a) for q, a in data.items() if isinstance(a, str)])
 
     def get_cache(self, question: str):
-        data = self._read_cache()
-        return data.get(question)
+        if self._conn is None:
+            return None
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT answer FROM cache WHERE key = ?", (self._make_key(question),)).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Failed to read cache: {e}")
+            return None
+        return row[0] if row else None
 
     def add_cache(self, question: str, answer: str) -> None:
-        data = self._read_cache()
-        data[question] = answer
-        self._write_cache(data)
+        if self._conn is None:
+            return
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, question, answer) VALUES (?, ?, ?)",
+                    (self._make_key(question), question, answer))
+        except sqlite3.Error as e:
+            logger.error(f"Failed to write cache: {e}")
+
+
+class RateLimiter:
+    """
+    令牌桶限流器, 同时限制每分钟请求数(RPM)和每分钟token数(TPM), 值为0表示不限制
+    参考OpenAI cookbook的api_request_parallel_processor.py, 可用容量随流逝时间持续恢复
+    """
+
+    def __init__(self, rpm: float = 0, tpm: float = 0, burst: float = None):
+        self.rpm = rpm
+        self.tpm = tpm
+        # 请求桶容量至少为1, 否则rpm<1时永远攒不够一次请求; burst=1时退化为固定间隔
+        self.max_request_capacity = max(burst or rpm, 1)
+        # 请求桶从仅够一次请求开始, 启动时不会瞬间突发满桶的请求
+        self.available_request_capacity = 1
+        self.available_token_capacity = tpm
+        self._last_update_time = time.monotonic()
+        self._resume_time = 0  # 暂停发放容量直到该时刻
+        self._lock = threading.Lock()
+
+    def _try_acquire(self, tokens: int) -> float:
+        """
+        尝试占用一次请求及对应token的容量, 成功返回0, 否则返回需要等待的秒数
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now < self._resume_time:
+                return self._resume_time - now
+            elapsed = now - self._last_update_time
+            self._last_update_time = now
+
+            wait_time = 0
+            if self.rpm:
+                self.available_request_capacity = min(
+                    self.max_request_capacity, self.available_request_capacity + self.rpm * elapsed / 60)
+                if self.available_request_capacity < 1:
+                    wait_time = (1 - self.available_request_capacity) * 60 / self.rpm
+            if self.tpm:
+                tokens = min(tokens, self.tpm)  # 单次请求超过桶容量时按满容量计, 避免永久等待
+                self.available_token_capacity = min(
+                    self.tpm, self.available_token_capacity + self.tpm * elapsed / 60)
+                if self.available_token_capacity < tokens:
+                    wait_time = max(wait_time, (tokens - self.available_token_capacity) * 60 / self.tpm)
+            if wait_time:
+                return wait_time
+
+            if self.rpm:
+                self.available_request_capacity -= 1
+            if self.tpm:
+                self.available_token_capacity -= tokens
+            return 0
+
+    def pause(self, seconds: float) -> None:
+        """
+        收到限流响应时暂停发放容量, 让共享此限流器的所有请求一起退避
+        """
+        with self._lock:
+            self._resume_time = max(self._resume_time, time.monotonic() + seconds)
+
+    def acquire(self, tokens: int = 0) -> None:
+        while (wait_time := self._try_acquire(tokens)) > 0:
+            time.sleep(wait_time)
+
+    async def aacquire(self, tokens: int = 0) -> None:
+        while (wait_time := self._try_acquire(tokens)) > 0:
+            await asyncio.sleep(wait_time)
 
 
 class Tiku:
@@ -58,11 +263,15 @@ class Tiku:
     COVER_RATE = 0.8  # 覆盖率
     true_list = []
     false_list = []
+    _true_set = frozenset()  # 由true_list/false_list预先构建, 用于判断题O(1)匹配
+    _false_set = frozenset()
 
     def __init__(self) -> None:
         self._name = None
         self._api = None
         self._conf = None
+        self._cache_dao = None
+        self._query_lock = threading.Lock()  # 默认_aquery使用, 保证同一实例的_query逐个执行
 
     @property
     def name(self):
@@ -80,6 +289,13 @@ class Tiku:
     def api(self, value):
         self._api = value
 
+    @property
+    def cache_dao(self):
+        # 缓存连接在首次查询时建立, 之后的查询复用
+        if self._cache_dao is None:
+            self._cache_dao = CacheDAO()
+        return self._cache_dao
+
     @property
     def token(self):
         return self._token
@@ -99,6 +315,8 @@ class Tiku:
             self.COVER_RATE = float(self._conf['cover_rate'])
             self.true_list = self._conf['true_list'].split(',')
             self.false_list = self._conf['false_list'].split(',')
+            self._true_set = frozenset(self.true_list)
+            self._false_set = frozenset(self.false_list)
             # 调用自定义题库初始化
             self._init_tiku()
 
@@ -114,8 +332,8 @@ class Tiku:
         从默认配置文件查询配置, 如果未能查到, 停用题库
         """
         try:
-            config = configparser.ConfigParser()
-            config.read(self.CONFIG_PATH, encoding="utf8")
+            mtime = os.path.getmtime(self.CONFIG_PATH)
+            config = _parse_ini_cached(os.path.abspath(self.CONFIG_PATH), mtime)
             return config['tiku']
         except (KeyError, FileNotFoundError):
             logger.info("未找到tiku配置, 已忽略题库功能")
@@ -126,31 +344,85 @@ class Tiku:
         if self.DISABLE:
             return None
 
+        answer = self._before_query(q_info)
+        if answer:
+            return answer
+        return self._after_query(q_info, self._query(q_info))
+
+    async def aquery(self, q_info: dict):
+        """
+        query的异步版本, 便于通过asyncio.gather并发搜题
+        """
+        if self.DISABLE:
+            return None
+
+        answer = self._before_query(q_info)
+        if answer:
+            return answer
+        return self._after_query(q_info, await self._aquery(q_info))
+
+    async def query_many(self, q_info_list: list, concurrency: int = 8) -> list:
+        """
+        并发查询多道题目, 通过信号量限制同时进行的请求数, 返回的答案与题目顺序一致
+        结束时关闭本次调用创建的异步客户端, 调用前已存在的客户端保留
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        loop = asyncio.get_running_loop()
+        existing = frozenset(key for key in _async_clients if key[-1] is loop)
+
+        async def _query_one(q_info: dict):
+            async with semaphore:
+                return await self.aquery(q_info)
+
+        try:
+            return await asyncio.gather(*[_query_one(q_info) for q_info in q_info_list])
+        finally:
+            await _close_async_clients(keep=existing)
+
+    def query_many_sync(self, q_info_list: list, concurrency: int = 8) -> list:
+        """
+        query_many的同步封装, 供非异步代码调用
+        """
+        return asyncio.run(self.query_many(q_info_list, concurrency))
+
+    async def aclose(self) -> None:
+        """
+        关闭当前事件循环中的异步客户端; 在自己的事件循环中直接调用aquery时, 应在事件循环结束前调用一次
+        """
+        await _close_async_clients()
+
+    def _before_query(self, q_info: dict):
+        """
+        预处理题目并查询缓存, 命中缓存时直接返回答案
+        """
         # 预处理, 去除【单选题】这样与标题无关的字段
-        logger.debug(f"原始标题：{q_info['title']}")
+        logger.debug("原始标题：{}", q_info['title'])
         q_info['title'] = sub(r'^\d+', '', q_info['title'])
         q_info['title'] = sub(r'（\d+\.\d+分）$', '', q_info['title'])
-        logger.debug(f"处理后标题：{q_info['title']}")
+        logger.debug("处理后标题：{}", q_info['title'])
 
         # 先过缓存
-        cache_dao = CacheDAO()
-        answer = cache_dao.get_cache(q_info['title'])
+        answer = self.cache_dao.get_cache(q_info['title'])
         if answer:
             logger.info(f"从缓存中获取答案：{q_info['title']} -> {answer}")
             return answer.strip()
-        else:
-            answer = self._query(q_info)
-            if answer:
-                answer = answer.strip()
-                cache_dao.add_cache(q_info['title'], answer)
-                logger.info(f"从{self.name}获取答案：{q_info['title']} -> {answer}")
-                if check_answer(answer, q_info['type'], self):
-                    return answer
-                else:
-                    logger.info(f"从{self.name}获取到的答案类型与题目类型不符，已舍弃")
-                    return None
-
-            logger.error(f"从{self.name}获取答案失败：{q_info['title']}")
+        return None
+
+    def _after_query(self, q_info: dict, answer):
+        """
+        校验题库返回的答案并写入缓存
+        """
+        if answer:
+            answer = answer.strip()
+            self.cache_dao.add_cache(q_info['title'], answer)
+            logger.info(f"从{self.name}获取答案：{q_info['title']} -> {answer}")
+            if check_answer(answer, q_info['type'], self):
+                return answer
+            else:
+                logger.info(f"从{self.name}获取到的答案类型与题目类型不符，已舍弃")
+                return None
+
+        logger.error(f"从{self.name}获取答案失败：{q_info['title']}")
         return None
 
     def _query(self, q_info: dict):
@@ -159,6 +431,17 @@ class Tiku:
         """
         pass
 
+    async def _aquery(self, q_info: dict):
+        """
+        异步查询接口, 自定义题库可重写; 默认在线程池中执行同步的_query
+        多数题库的_query依赖未加锁的实例状态(请求间隔计时、token计数等), 因此同一实例的查询加锁逐个执行
+        """
+        return await asyncio.to_thread(self._locked_query, q_info)
+
+    def _locked_query(self, q_info: dict):
+        with self._query_lock:
+            return self._query(q_info)
+
     def get_tiku_from_config(self):
         """
         从配置文件加载题库, 这个配置可以是用户提供, 可以是默认配置文件
@@ -189,15 +472,15 @@ class Tiku:
             return False
         # 对响应的答案作处理
         answer = answer.strip()
-        if answer in self.true_list:
+        if answer in self._true_set:
             return True
-        elif answer in self.false_list:
+        elif answer in self._false_set:
             return False
         else:
-            # 无法判断, 随机选择
+            # 无法判断, 按答案内容的哈希选择, 相同的答案总是得到相同的结果, 便于缓存和复现
             logger.error(
-                f'无法判断答案 -> {answer} 对应的是正确还是错误, 请自行判断并加入配置文件重启脚本, 本次将会随机选择选项')
-            return random.choice([True, False])
+                f'无法判断答案 -> {answer} 对应的是正确还是错误, 请自行判断并加入配置文件重启脚本, 本次将根据答案内容固定选择一个选项')
+            return hashlib.blake2s(answer.encode("utf8"), digest_size=1).digest()[0] & 1 == 0
 
     def get_submit_params(self):
         """
@@ -421,6 +704,14 @@ class TikuAdapter(Tiku):
 
 class AI(Tiku):
     # AI大模型答题实现
+    SYSTEM_PROMPTS = {
+        "single": "本题为单选题，你只能选择一个选项，请根据题目和选项回答问题，以json格式输出正确的选项内容，示例回答：{\"Answer\": [\"答案\"]}。除此之外不要输出任何多余的内容，也不要使用MD语法。如果你使用了互联网搜索，也请不要返回搜索的结果和参考资料",
+        "multiple": "本题为多选题，你必须选择两个或以上选项，请根据题目和选项回答问题，以json格式输出正确的选项内容，示例回答：{\"Answer\": [\"答案1\",\n\"答案2\",\n\"答案3\"]}。除此之外不要输出任何多余的内容，也不要使用MD语法。如果你使用了互联网搜索，也请不要返回搜索的结果和参考资料",
+        "completion": "本题为填空题，你必须根据语境和相关知识填入合适的内容，请根据题目回答问题，以json格式输出正确的答案，示例回答：{\"Answer\": [\"答案\"]}。除此之外不要输出任何多余的内容，也不要使用MD语法。如果你使用了互联网搜索，也请不要返回搜索的结果和参考资料",
+        "judgement": "本题为判断题，你只能回答正确或者错误，请根据题目回答问题，以json格式输出正确的答案，示例回答：{\"Answer\": [\"正确\"]}。除此之外不要输出任何多余的内容，也不要使用MD语法。如果你使用了互联网搜索，也请不要返回搜索的结果和参考资料",
+    }
+    DEFAULT_SYSTEM_PROMPT = "本题为简答题，你必须根据语境和相关知识填入合适的内容，请根据题目回答问题，以json格式输出正确的答案，示例回答：{\"Answer\": [\"这是我的答案\"]}。除此之外不要输出任何多余的内容，也不要使用MD语法。如果你使用了互联网搜索，也请不要返回搜索的结果和参考资料"
+
     def __init__(self) -> None:
         super().__init__()
         self.name = 'AI大模型答题'
@@ -433,6 +724,8 @@ class AI(Tiku):
             match = re.search(pattern, md_str, re.DOTALL)
             return match.group(1).strip() if match else md_str.strip()
 
+        from openai import OpenAI
+
         if self.http_proxy:
             proxy = self.http_proxy
             httpx_client = httpx.Client(proxy=proxy)
@@ -443,84 +736,23 @@ class AI(Tiku):
         options_list = q_info['options'].split('\n')
         cleaned_options = [re.sub(r"^[A-Z]\s*", "", option) for option in options_list]
         options = "\n".join(cleaned_options)
-        # 判断题目类型
-        if q_info['type'] == "single":
-            completion = client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "本题为单选题，你只能选择一个选项，请根据题目和选项回答问题，以json格式输出正确的选项内容，示例回答：{\"Answer\": [\"答案\"]}。除此之外不要输出任何多余的内容，也不要使用MD语法。如果你使用了互联网搜索，也请不要返回搜索的结果和参考资料"
-                    },
-                    {
-                        "role": "user",
-                        "content": f"题目：{q_info['title']}\n选项：{options}"
-                    }
-                ]
-            )
-        elif q_info['type'] == 'multiple':
-            completion = client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "本题为多选题，你必须选择两个或以上选项，请根据题目和选项回答问题，以json格式输出正确的选项内容，示例回答：{\"Answer\": [\"答案1\",\n\"答案2\",\n\"答案3\"]}。除此之外不要输出任何多余的内容，也不要使用MD语法。如果你使用了互联网搜索，也请不要返回搜索的结果和参考资料"
-                    },
-                    {
-                        "role": "user",
-                        "content": f"题目：{q_info['title']}\n选项：{options}"
-                    }
-                ]
-            )
-        elif q_info['type'] == 'completion':
-            completion = client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "本题为填空题，你必须根据语境和相关知识填入合适的内容，请根据题目回答问题，以json格式输出正确的答案，示例回答：{\"Answer\": [\"答案\"]}。除此之外不要输出任何多余的内容，也不要使用MD语法。如果你使用了互联网搜索，也请不要返回搜索的结果和参考资料"
-                    },
-                    {
-                        "role": "user",
-                        "content": f"题目：{q_info['title']}"
-                    }
-                ]
-            )
-        elif q_info['type'] == 'judgement':
-            completion = client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "本题为判断题，你只能回答正确或者错误，请根据题目回答问题，以json格式输出正确的答案，示例回答：{\"Answer\": [\"正确\"]}。除此之外不要输出任何多余的内容，也不要使用MD语法。如果你使用了互联网搜索，也请不要返回搜索的结果和参考资料"
-                    },
-                    {
-                        "role": "user",
-                        "content": f"题目：{q_info['title']}"
-                    }
-                ]
-            )
+        # 判断题目类型, 选择题附带选项
+        system_prompt = self.SYSTEM_PROMPTS.get(q_info['type'], self.DEFAULT_SYSTEM_PROMPT)
+        if q_info['type'] in ("single", "multiple"):
+            user_content = f"题目：{q_info['title']}\n选项：{options}"
         else:
-            completion = client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "本题为简答题，你必须根据语境和相关知识填入合适的内容，请根据题目回答问题，以json格式输出正确的答案，示例回答：{\"Answer\": [\"这是我的答案\"]}。除此之外不要输出任何多余的内容，也不要使用MD语法。如果你使用了互联网搜索，也请不要返回搜索的结果和参考资料"
-                    },
-                    {
-                        "role": "user",
-                        "content": f"题目：{q_info['title']}"
-                    }
-                ]
-            )
+            user_content = f"题目：{q_info['title']}"
+        completion = client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": user_content}]
+        )
 
         try:
             if self.last_request_time:
                 interval_time = time.time() - self.last_request_time
                 if interval_time < self.min_interval_seconds:
                     sleep_time = self.min_interval_seconds - interval_time
-                    logger.debug(f"API请求间隔过短, 等待 {sleep_time} 秒")
+                    logger.debug("API请求间隔过短, 等待 {} 秒", sleep_time)
                     time.sleep(sleep_time)
             self.last_request_time = time.time()
             response = json.loads(remove_md_json_wrapper(completion.choices[0].message.content))
@@ -627,100 +859,410 @@ class SiliconFlow(Tiku):
 
 
 # ------------------------ DeepSeek大模型题库类（替换原豆包类） ------------------------
+class _StreamCollector:
+    """
+    逐行处理SSE流式响应, 收集增量文本, 并在出现右括号时尝试解析出完整的JSON对象
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._answer_json = None
+
+    def feed(self, line: str) -> bool:
+        """
+        处理一行SSE数据, 返回True表示可以停止读取
+        已收到完整JSON后, 模型仍在输出多余内容时才提前结束, 否则读完响应以便连接回到连接池复用
+        """
+        delta = self._parse_stream_line(line)
+        if self._answer_json is not None:
+            return self._has_trailing_output(delta)
+        self._chunks.append(delta)
+        if '}' in delta:
+            self._answer_json = self._extract_complete_json(''.join(self._chunks))
+        return False
+
+    def result(self):
+        """已解析出完整JSON时返回解析结果, 否则返回收到的文本内容"""
+        return self._answer_json if self._answer_json is not None else ''.join(self._chunks)
+
+    @staticmethod
+    def _parse_stream_line(line: str) -> str:
+        """解析一行SSE数据, 返回其中的增量文本"""
+        if not line.startswith('data:'):
+            return ''
+        data = line[5:].strip()
+        if not data or data == '[DONE]':
+            return ''
+        chunk = _json_loads(data)
+        if 'error' in chunk:
+            raise ValueError(f"流式响应返回错误：{chunk['error']}")
+        choices = chunk.get('choices')
+        if not choices:
+            return ''
+        return choices[0].get('delta', {}).get('content') or ''
+
+    @staticmethod
+    def _extract_complete_json(content: str):
+        """流式输出时尝试从已收到的内容中解析完整的JSON对象, 尚不完整时返回None"""
+        start, end = content.find('{'), content.rfind('}')
+        if start == -1 or end < start:
+            return None
+        try:
+            return _json_loads(content[start:end + 1])
+        except json.JSONDecodeError:
+            return None
+
+    @staticmethod
+    def _has_trailing_output(delta: str) -> bool:
+        """JSON之后的增量是否为多余输出; 仅有空白或代码块结束标记时继续读到[DONE], 让连接回到连接池复用"""
+        return bool(delta.strip().strip('`'))
+
+
 class Doubao(Tiku):
     """DeepSeek大模型答题实现（适配DeepSeek-V3.2 API）"""
+    # 按题目类型定制的系统提示词
+    SYSTEM_PROMPTS = {
+        "single": "本题为单选题，仅选择一个正确选项，直接输出选项的具体内容（不要ABCD字母），以JSON格式返回：{\"Answer\": [\"正确选项内容\"]}。禁止输出任何多余解释、MD语法或参考资料。",
+        "multiple": "本题为多选题，选择所有正确选项，直接输出选项的具体内容（不要ABCD字母），以JSON格式返回：{\"Answer\": [\"选项1\", \"选项2\"]}。禁止输出任何多余解释、MD语法或参考资料。",
+        "completion": "本题为填空题，直接给出正确答案，以JSON格式返回：{\"Answer\": [\"答案内容\"]}。禁止输出任何多余解释、MD语法或参考资料。",
+        "judgement": "本题为判断题，仅回答“正确”或“错误”，以JSON格式返回：{\"Answer\": [\"正确\"]}。禁止输出任何多余解释、MD语法或参考资料。",
+    }
+    # 各题型答案只是很短的JSON对象, 按题型进一步限制输出长度（不超过max_tokens）
+    TYPE_MAX_TOKENS = {"judgement": 32, "single": 128, "completion": 128, "multiple": 256}
+    IMAGE_TOKENS = 1000  # 估算限流占用时每张图片计入的token数
+    DEFAULT_SYSTEM_PROMPT = "本题为简答题，直接给出核心答案，以JSON格式返回：{\"Answer\": [\"答案内容\"]}。禁止输出任何多余解释、MD语法或参考资料。"
+    # 批量答题：多道题目以JSON数组提交，按顺序返回答案数组
+    BATCH_TYPE_NAMES = {"single": "单选题", "multiple": "多选题", "completion": "填空题", "judgement": "判断题"}
+    BATCH_SYSTEM_PROMPT = "以下JSON数组中每一项为一道题目，包含题型(type)、题干(title)和选项(options)。请按数组顺序逐题作答：单选题仅选择一个正确选项，多选题选择所有正确选项，选择题直接输出选项的具体内容（不要ABCD字母）；填空题直接给出正确答案；判断题仅回答“正确”或“错误”；简答题直接给出核心答案。以JSON格式返回：{\"Answers\": [[\"第1题答案\"], [\"第2题答案1\", \"第2题答案2\"]]}，Answers的长度必须与题目数量一致且顺序对应。禁止输出任何多余解释、MD语法或参考资料。"
 
     def __init__(self) -> None:
         super().__init__()
         self.name = 'DeepSeek-V3.2（开放平台）'
-        self.last_request_time = None  # 记录最后一次请求时间，防止频率超限
-
-    def _query(self, q_info: dict):
-        """核心：调用DeepSeek API查询题目答案"""
-
-        # 工具函数：清理大模型输出的多余格式（比如```json包裹）
-        def clean_response(content):
-            pattern = r'^\s*```(?:json)?\s*(.*?)\s*```\s*$'
-            match = re.search(pattern, content, re.DOTALL)
-            return match.group(1).strip() if match else content.strip()
+        self.max_tokens = 256
+        self._is_reasoner = False  # 是否为思考模式模型（deepseek-reasoner）
+        self.vision = False  # 是否将题目中的图片发送给模型（需视觉模型）
+        self.inline_images = True  # 图片先下载并内联为base64，避免服务端对每道题重复拉取
+        self.max_retries = 5
+        self.timeout = 30  # 单次请求超时（秒），SDK默认600秒，单个请求卡住会长时间阻塞答题
+        self.rate_limiter = None  # 令牌桶限流器，防止频率超限
+        # 系统消息不随题目变化，预先构建后每次请求直接复用
+        self._system_messages = {
+            q_type: {"role": "system", "content": prompt} for q_type, prompt in self.SYSTEM_PROMPTS.items()
+        }
+        self._default_system_message = {"role": "system", "content": self.DEFAULT_SYSTEM_PROMPT}
+        self._batch_system_message = {"role": "system", "content": self.BATCH_SYSTEM_PROMPT}
 
-        # 1. 构造题目信息（类型+题干+选项）
+    @staticmethod
+    def _clean_response(content):
+        """清理大模型输出的多余格式（比如```json包裹）"""
+        content = content.strip()
+        if '```' not in content:
+            return content
+        # 返回的JSON必然以{开头、以}结尾, 直接截取, 无需逐个替换代码块标记
+        start, end = content.find('{'), content.rfind('}')
+        if start != -1 and end > start:
+            return content[start:end + 1]
+        return content.replace('```json', '').replace('```', '').strip()
+
+    def _build_messages(self, q_info: dict) -> list:
+        """构造题目信息（类型+题干+选项）及对应的系统提示词"""
         q_type = q_info['type']  # single/multiple/completion/judgement
         q_title = q_info['title']
         q_options = q_info.get('options', '')  # 选项可能为空（如填空题）
         full_question = f"题目：{q_title}\n选项：{q_options}" if q_options else f"题目：{q_title}"
 
-        # 2. 构造DeepSeek API的系统提示词（按题目类型定制）
-        system_prompt = ""
-        if q_type == "single":
-            system_prompt = "本题为单选题，仅选择一个正确选项，直接输出选项的具体内容（不要ABCD字母），以JSON格式返回：{\"Answer\": [\"正确选项内容\"]}。禁止输出任何多余解释、MD语法或参考资料。"
-        elif q_type == "multiple":
-            system_prompt = "本题为多选题，选择所有正确选项，直接输出选项的具体内容（不要ABCD字母），以JSON格式返回：{\"Answer\": [\"选项1\", \"选项2\"]}。禁止输出任何多余解释、MD语法或参考资料。"
-        elif q_type == "completion":
-            system_prompt = "本题为填空题，直接给出正确答案，以JSON格式返回：{\"Answer\": [\"答案内容\"]}。禁止输出任何多余解释、MD语法或参考资料。"
-        elif q_type == "judgement":
-            system_prompt = "本题为判断题，仅回答“正确”或“错误”，以JSON格式返回：{\"Answer\": [\"正确\"]}。禁止输出任何多余解释、MD语法或参考资料。"
-        else:
-            system_prompt = "本题为简答题，直接给出核心答案，以JSON格式返回：{\"Answer\": [\"答案内容\"]}。禁止输出任何多余解释、MD语法或参考资料。"
+        system_message = self._system_messages.get(q_type, self._default_system_message)
+        image_urls = _IMG_PATTERN.findall(full_question) if self.vision else []
+        if not image_urls:
+            return [system_message, {"role": "user", "content": full_question}]
+
+        # 视觉模型：题目中的图片作为图片内容一并发送
+        user_content = [{"type": "text", "text": full_question}]
+        for url in image_urls:
+            user_content.append({"type": "image_url", "image_url": {"url": self._image_url(url)}})
+        return [system_message, {"role": "user", "content": user_content}]
+
+    def _image_url(self, url: str) -> str:
+        """按配置将图片内联为data URI, 下载失败或图片过大时退回原始地址"""
+        if not self.inline_images:
+            return url
+        try:
+            return _inline_image(url)
+        except (httpx.HTTPError, httpx.InvalidURL, ValueError) as e:
+            logger.warning(f"题目图片下载失败，将直接发送图片地址：{url} {str(e)}")
+            return url
+
+    def _max_tokens_for(self, q_type: str) -> int:
+        """按题型确定单题的max_tokens, 思考模式的max_tokens包含思维链长度, 不按题型限制"""
+        if self._is_reasoner:
+            return self.max_tokens
+        return min(self.max_tokens, self.TYPE_MAX_TOKENS.get(q_type, self.max_tokens))
+
+    def _estimate_tokens(self, messages: list, max_tokens: int) -> int:
+        """粗略估算一次请求占用的token数, 中文约一字一token, 按字符数计偏保守; 每张图片按IMAGE_TOKENS计"""
+        tokens = max_tokens
+        for message in messages:
+            content = message['content']
+            if isinstance(content, str):
+                tokens += len(content)
+                continue
+            for part in content:
+                tokens += len(part['text']) if part['type'] == 'text' else self.IMAGE_TOKENS
+        return tokens
+
+    def _load_json(self, content):
+        """解析大模型返回的JSON, 解析失败时返回None"""
+        if isinstance(content, dict):
+            # 流式读取时已解析
+            return content
+        cleaned_content = content.strip()
+        # 大多数情况下返回的就是纯JSON, 仅在带有```json包裹等格式时才做清理
+        if not cleaned_content.startswith('{'):
+            cleaned_content = self._clean_response(cleaned_content)
+        try:
+            return _json_loads(cleaned_content)
+        except json.JSONDecodeError as e:
+            answer_json = self._repair_json(cleaned_content)
+            if answer_json is None:
+                logger.error(f"DeepSeek返回内容解析失败：{str(e)}，原始内容：{content}")
+            return answer_json
 
-        # 3. 构造DeepSeek API请求参数
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}"  # DeepSeek的API Key
-        }
-        payload = {
+    @staticmethod
+    def _repair_json(content: str):
+        """
+        尝试修复一次常见的格式问题: JSON前后夹杂文字、多余的尾逗号、使用单引号, 修复失败返回None
+        """
+        start, end = content.find('{'), content.rfind('}')
+        if start == -1 or end < start:
+            return None
+        content = re.sub(r',\s*([\]}])', r'\1', content[start:end + 1])
+        try:
+            return _json_loads(content)
+        except json.JSONDecodeError:
+            pass
+        try:
+            answer_json = ast.literal_eval(content)
+        except (ValueError, SyntaxError):
+            return None
+        return answer_json if isinstance(answer_json, dict) else None
+
+    def _parse_answer(self, content):
+        """解析大模型返回的答案, 拼接为兼容原有逻辑的字符串格式"""
+        answer_json = self._load_json(content)
+        if answer_json is None:
+            return None
+
+        answer_list = answer_json.get('Answer', [])
+        if not answer_list:
+            logger.error("DeepSeek返回的答案为空")
+            return None
+        return "\n".join(answer_list).strip()
+
+    @functools.cached_property
+    def _retryable_errors(self) -> tuple:
+        """
+        可重试的瞬时错误：限流(429)、网络异常/超时、服务端错误(5xx)
+        流式读取期间的网络异常不经过SDK封装, 以httpx.TransportError的形式抛出
+        """
+        openai = _import_openai()
+        return openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError, httpx.TransportError
+
+    @functools.cached_property
+    def _fatal_errors(self) -> tuple:
+        """鉴权失败重试无意义, 继续答题只会让每道题都白白请求一次"""
+        openai = _import_openai()
+        return openai.AuthenticationError, openai.PermissionDeniedError
+
+    def _backoff_delay(self, retries: int) -> float:
+        """带随机抖动的指数退避等待时间（秒）"""
+        return max(1.0, random.uniform(0, min(30, 2 ** retries)))
+
+    def _on_retryable_error(self, e: Exception, retries: int):
+        """第retries次重试前调用, 返回需要等待的秒数; 已达最大重试次数时返回None, 由调用方抛出异常"""
+        if retries > self.max_retries:
+            return None
+        delay = self._backoff_delay(retries)
+        if isinstance(e, _import_openai().RateLimitError):
+            # 被限流时暂停共享的限流器, 避免其他并发请求继续触发429
+            self.rate_limiter.pause(delay)
+        logger.warning(f"DeepSeek API请求失败：{str(e)}，{delay:.2f}秒后重试... ({retries}/{self.max_retries})")
+        return delay
+
+    def _completion_params(self, messages: list, max_tokens: int) -> dict:
+        """补全请求参数, 同步与异步请求共用"""
+        return {
             "model": self.model,  # DeepSeek模型名：deepseek-chat/deepseek-reasoner
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": full_question}
-            ],
+            "messages": messages,
             "temperature": 0.1,  # 低随机性，保证答案稳定
-            "max_tokens": 1024,
-            "stream": False  # 非流式输出
+            "max_tokens": max_tokens,
+            "stream": True  # 流式输出，收到完整JSON后即可结束
         }
 
-        # 4. 处理请求频率限制（避免API超限）
-        if self.last_request_time:
-            interval = time.time() - self.last_request_time
-            if interval < self.min_interval:
-                sleep_time = self.min_interval - interval
-                logger.debug(f"DeepSeek API请求间隔过短，等待{sleep_time:.2f}秒")
-                time.sleep(sleep_time)
-        self.last_request_time = time.time()
+    def _do_completion(self, messages: list, max_tokens: int = None):
+        """
+        调用补全接口, 对限流、网络异常、服务端错误进行指数退避重试
+        流式读取期间已解析出完整JSON时直接返回解析结果, 否则返回文本内容
+        """
+        max_tokens = max_tokens or self.max_tokens
+        retries = 0
+        while True:
+            # 处理请求频率限制（避免API超限）, 重试同样计入限流
+            self.rate_limiter.acquire(self._estimate_tokens(messages, max_tokens))
+            try:
+                # 直接读取原始SSE数据行, 省去SDK为每个增量构造Pydantic模型的开销
+                with self.client.chat.completions.with_streaming_response.create(
+                        **self._completion_params(messages, max_tokens)) as response:
+                    collector = _StreamCollector()
+                    for line in response.iter_lines():
+                        if collector.feed(line):
+                            break
+                    return collector.result()
+            except self._retryable_errors as e:
+                retries += 1
+                delay = self._on_retryable_error(e, retries)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+
+    async def _ado_completion(self, messages: list, max_tokens: int = None):
+        """_do_completion的异步版本"""
+        max_tokens = max_tokens or self.max_tokens
+        retries = 0
+        while True:
+            await self.rate_limiter.aacquire(self._estimate_tokens(messages, max_tokens))
+            try:
+                async with self.aclient.chat.completions.with_streaming_response.create(
+                        **self._completion_params(messages, max_tokens)) as response:
+                    collector = _StreamCollector()
+                    async for line in response.iter_lines():
+                        if collector.feed(line):
+                            break
+                    return collector.result()
+            except self._retryable_errors as e:
+                retries += 1
+                delay = self._on_retryable_error(e, retries)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+
+    def _handle_query_error(self, e: Exception) -> None:
+        """
+        统一处理单题/批量查询中的异常, 由调用方在except中调用, 随后返回None
+        鉴权类错误无法通过重试恢复, 转换为PermissionError抛出以终止答题; 其余异常按类型记录日志
+        """
+        openai = _import_openai()
+        if isinstance(e, self._fatal_errors):
+            logger.error(f"DeepSeek API鉴权失败：{str(e)}")
+            raise PermissionError(f'{self.name} API Key无效或无权限, 请检查doubao_api_key配置') from e
+        if isinstance(e, openai.RateLimitError):
+            logger.error(f"DeepSeek API持续限流，已达最大重试次数：{str(e)}")
+        elif isinstance(e, openai.APIError):
+            logger.error(f"DeepSeek API请求失败：{str(e)}")
+        else:
+            logger.error(f"DeepSeek答题逻辑异常：{str(e)}")
 
-        # 5. 调用DeepSeek API并解析结果
+    def _query(self, q_info: dict):
+        """核心：调用DeepSeek API查询题目答案"""
+        # JSON解析放在重试之外, 解析失败不会重复请求API
         try:
-            response = requests.post(
-                url=self.api_endpoint,
-                headers=headers,
-                json=payload,
-                verify=False,
-                timeout=30
-            )
-            response.raise_for_status()  # 抛出HTTP错误（如401、429）
-            res_json = response.json()
+            messages = self._build_messages(q_info)
+            return self._parse_answer(self._do_completion(messages, self._max_tokens_for(q_info['type'])))
+        except Exception as e:
+            self._handle_query_error(e)
 
-            # 解析返回的答案
-            content = res_json['choices'][0]['message']['content']
-            cleaned_content = clean_response(content)
-            answer_json = json.loads(cleaned_content)
-            answer_list = answer_json.get('Answer', [])
+        return None
 
-            if not answer_list:
-                logger.error("DeepSeek返回的答案为空")
-                return None
+    async def _aquery(self, q_info: dict):
+        """_query的异步版本, 请求期间不阻塞事件循环"""
+        try:
+            if self.vision:
+                # 构造消息时可能需要下载图片, 放到线程中执行
+                messages = await asyncio.to_thread(self._build_messages, q_info)
+            else:
+                messages = self._build_messages(q_info)
+            return self._parse_answer(await self._ado_completion(messages, self._max_tokens_for(q_info['type'])))
+        except Exception as e:
+            self._handle_query_error(e)
 
-            # 拼接答案（兼容原有逻辑的字符串格式）
-            return "\n".join(answer_list).strip()
+        return None
 
-        except requests.exceptions.RequestException as e:
-            logger.error(f"DeepSeek API请求失败：{str(e)}，响应内容：{response.text if 'response' in locals() else '无'}")
-        except json.JSONDecodeError as e:
-            logger.error(f"DeepSeek返回内容解析失败：{str(e)}，原始内容：{content}")
+    def query_batch(self, q_info_list: list, batch_size: int = 10) -> list:
+        """
+        将多道题目合并到一次请求中作答, 受RPM限制时可成倍减少请求次数, 返回的答案与题目顺序一致
+        某一批返回的答案数量与题目数量不一致时, 该批逐题回退到单题查询
+        """
+        if self.DISABLE:
+            return [None] * len(q_info_list)
+
+        answers = [None] * len(q_info_list)
+        pending = []  # 未命中缓存的题目下标
+        for index, q_info in enumerate(q_info_list):
+            answers[index] = self._before_query(q_info)
+            if not answers[index]:
+                pending.append(index)
+
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            results = self._query_batch([q_info_list[index] for index in batch])
+            if results is None:
+                logger.info(f"批量答题失败，逐题查询{len(batch)}道题目")
+                results = [self._query(q_info_list[index]) for index in batch]
+            for index, result in zip(batch, results):
+                answers[index] = self._after_query(q_info_list[index], result)
+        return answers
+
+    def _query_batch(self, q_info_list: list):
+        """一次请求作答多道题目, 失败或答案数量不一致时返回None"""
+        questions = [
+            {
+                "type": self.BATCH_TYPE_NAMES.get(q_info['type'], "简答题"),
+                "title": q_info['title'],
+                "options": q_info.get('options', '')
+            }
+            for q_info in q_info_list
+        ]
+        messages = [self._batch_system_message, {"role": "user", "content": json.dumps(questions, ensure_ascii=False)}]
+
+        try:
+            max_tokens = sum(self._max_tokens_for(q_info['type']) for q_info in q_info_list)
+            content = self._do_completion(messages, max_tokens)
         except Exception as e:
-            logger.error(f"DeepSeek答题逻辑异常：{str(e)}")
+            # 与_query一致处理, 返回None后由调用方逐题回退
+            self._handle_query_error(e)
+            return None
 
-        return None
+        try:
+            answer_json = self._load_json(content)
+        except Exception as e:
+            logger.error(f"DeepSeek批量答题返回内容解析失败：{str(e)}，原始内容：{content}")
+            return None
+        answer_list = answer_json.get('Answers') if isinstance(answer_json, dict) else None
+        if not isinstance(answer_list, list) or len(answer_list) != len(q_info_list):
+            logger.error(f"DeepSeek批量答题返回的答案数量与题目数量不一致，原始内容：{content}")
+            return None
+
+        results = []
+        for answer in answer_list:
+            # 模型可能返回非字符串的答案项(如填空题的数字), 统一转为字符串; 结构不符时整批回退
+            items = answer if isinstance(answer, list) else [answer]
+            if not all(isinstance(item, (str, int, float)) for item in items):
+                logger.error(f"DeepSeek批量答题返回的答案格式不正确，原始内容：{content}")
+                return None
+            results.append("\n".join(map(str, items)).strip())
+        return results
+
+    @property
+    def aclient(self):
+        return _get_async_client(self.api_key, self.base_url, self.timeout)
+
+    @property
+    def client(self):
+        # 客户端在首次请求时才创建（同时才导入openai）, 之后由_get_client缓存复用
+        return _get_client(self.api_key, self.base_url, self.timeout)
+
+    def _init_client(self):
+        # SDK需要的是base_url, 配置中的地址带有/chat/completions后缀
+        self.base_url = self.api_endpoint.removesuffix('/').removesuffix('/chat/completions')
 
     def _init_tiku(self):
         """从config.ini加载DeepSeek配置"""
@@ -729,25 +1271,27 @@ class Doubao(Tiku):
                                            'https://api.deepseek.com/v1/chat/completions')  # DeepSeek固定地址
         self.api_key = self._conf['doubao_api_key']  # DeepSeek的API Key（配置项名保留，值替换为DeepSeek的Key）
         self.model = self._conf.get('doubao_model', 'deepseek-chat')  # DeepSeek模型名（默认非思考模式）
-        self.min_interval = int(self._conf.get('doubao_min_interval', 1))  # 请求间隔（秒）
-
-
-# 补充缺失的logger和answer_check模块（保证代码可运行）
-# 实际使用时请替换为项目中真实的logger和answer_check实现
-class logger:
-    @staticmethod
-    def info(msg):
-        print(f"[INFO] {msg}")
-
-    @staticmethod
-    def error(msg):
-        print(f"[ERROR] {msg}")
-
-    @staticmethod
-    def debug(msg):
-        print(f"[DEBUG] {msg}")
+        # 最大输出token数，答案很短，限制后可降低TPM占用和尾部延迟；思考模式的max_tokens包含思维链，需保留较大值
+        self._is_reasoner = 'reasoner' in self.model
+        self.max_tokens = int(self._conf.get('doubao_max_tokens') or (8192 if self._is_reasoner else 256))
+        # 图片题支持（需使用视觉模型），图片默认内联为base64发送
+        self.vision = str(self._conf.get('doubao_vision', 'false')).lower() == 'true'
+        self.inline_images = str(self._conf.get('doubao_inline_images', 'true')).lower() == 'true'
+        min_interval = float(self._conf.get('doubao_min_interval', 1) or 0)  # 请求间隔（秒）
+        # 每分钟请求数/token数上限，未配置doubao_rpm时按请求间隔换算，且不允许突发，与固定间隔等价
+        rpm = float(self._conf.get('doubao_rpm') or 0)
+        tpm = float(self._conf.get('doubao_tpm') or 0)
+        if rpm:
+            self.rate_limiter = RateLimiter(rpm, tpm)
+        else:
+            self.rate_limiter = RateLimiter(60 / min_interval if min_interval > 0 else 0, tpm, burst=1)
+        self.max_retries = int(self._conf.get('doubao_max_retries') or 5)  # 瞬时错误最大重试次数
+        self.timeout = float(self._conf.get('doubao_timeout') or 30)  # 单次请求超时（秒）
+        self._init_client()
 
 
+# 补充缺失的answer_check模块（保证代码可运行）
+# 实际使用时请替换为项目中真实的answer_check实现
 def check_answer(answer, q_type, tiku):
     """简化的答案校验逻辑（实际需根据业务调整）"""
     if q_type == "judgement":
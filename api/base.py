@@ -9,7 +9,7 @@ import requests
 from requests.adapters import HTTPAdapter
 
 # 改为相对导入：tiku.py和base.py在同一api文件夹下
-from .tiku import DoubaoTiku
+from .tiku import DoubaoTiku, Tiku
 
 from api.answer import *
 from api.cipher import AESCipher
@@ -81,8 +81,11 @@ class Chaoxing:
     def __init__(self, account: Account = None, tiku: DoubaoTiku = None,**kwargs):
         self.account = account
         self.cipher = AESCipher()
-        # 若未传入tiku实例，自动初始化DoubaoTiku
-        self.tiku = tiku if tiku else DoubaoTiku(conf_path="config.ini")
+        # 若未传入tiku实例（如题库初始化失败），使用停用状态的题库
+        if not tiku:
+            tiku = Tiku()
+            tiku.DISABLE = True
+        self.tiku = tiku
         self.kwargs = kwargs
         self.rollback_times = 0
 
@@ -321,9 +324,9 @@ class Chaoxing:
                 return answer
 
             if q["type"] == "multiple":
-                logger.debug(f"当前选项列表[cut前] -> {options}")
+                logger.debug("当前选项列表[cut前] -> %s", options)
                 _op_list = multi_cut(options)
-                logger.debug(f"当前选项列表[cut后] -> {_op_list}")
+                logger.debug("当前选项列表[cut后] -> %s", _op_list)
 
                 if not _op_list:
                     logger.error("选项为空, 未能正确提取题目选项信息! 请反馈并提供以上信息")
@@ -493,7 +496,7 @@ class Chaoxing:
         total_questions = len(questions["questions"])
         found_answers = 0
         for q in questions["questions"]:
-            logger.debug(f"当前题目信息 -> {q}")
+            logger.debug("当前题目信息 -> %s", q)
             query_delay = self.kwargs.get("query_delay",0)
             time.sleep(query_delay)
             # 调用DoubaoTiku的query方法搜题
@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+# 题库实现统一维护在answer.py中, 本模块仅做兼容导出, 避免同一套题库代码重复存在
+from api.answer import Doubao, Tiku
+
+# DoubaoTiku即answer.py中的Doubao题库（内部已适配DeepSeek）
+DoubaoTiku = Doubao
+
+__all__ = ["Tiku", "Doubao", "DoubaoTiku"]
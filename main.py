@@ -84,12 +84,16 @@ def load_config_from_file(config_path):
     if config.has_section("tiku"):
         tiku_config = dict(config.items("tiku"))
         # 处理数值类型转换
-        for key in ["delay", "cover_rate", "doubao_min_interval"]:
+        # 格式错误时使用的默认值, 未列出的配置项保持原值, 由题库自行处理
+        defaults = {"doubao_min_interval": 1.0, "doubao_rpm": 0.0, "doubao_tpm": 0.0}
+        for key in ["delay", "cover_rate", "doubao_min_interval", "doubao_rpm", "doubao_tpm"]:
             if key in tiku_config:
                 try:
                     tiku_config[key] = float(tiku_config[key])
                 except ValueError:
                     logger.warning(f"配置项 {key} 格式错误，使用默认值")
+                    if key in defaults:
+                        tiku_config[key] = defaults[key]
     
     # 检查并读取notification节
     if config.has_section("notification"):